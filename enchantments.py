@@ -1,10 +1,18 @@
 import curses
+import inspect
+import logging
+import math
+import re
+import time
 import unicodedata
 
-from collections import ChainMap
+from collections import ChainMap, deque
 from contextlib import contextmanager
 
 
+logger = logging.getLogger(__name__)
+
+
 def remove_control_characters(text):
     return ''.join(char for char in text if unicodedata.category(char)[0] != "C")
 
@@ -18,17 +26,72 @@ class InvalidPosition(Exception):
     pass
 
 
+class ReadTimeout(Exception):
+    pass
+
+
+class FocusChanged(Exception):
+    pass
+
+
+def make_deadline(timeout=None, deadline=None):
+    """Combine a relative timeout (seconds) and an absolute monotonic deadline."""
+    if timeout is not None:
+        timeout_deadline = time.monotonic() + timeout
+        deadline = timeout_deadline if deadline is None else min(deadline, timeout_deadline)
+    return deadline
+
+
 class MockScr:
-    def __init__(self, h, w):
+    def __init__(self, h, w, keys=()):
         self.h = h
         self.w = w
+        self.y = 0
+        self.x = 0
+        self.keys = deque(keys)
+        self.delay = -1
+        self.touched = False
 
-    def addstr(self, y, x, s):
+    def addstr(self, *args):
+        self.touched = True
+
+    def derwin(self, nlines, ncols, begin_y, begin_x):
+        window = MockScr(nlines, ncols)
+        window.keys = self.keys  # input is shared by all windows
+        return window
+
+    def keypad(self, flag):
         pass
 
+    def is_wintouched(self):
+        return self.touched
+
+    def noutrefresh(self):
+        self.touched = False
+
     def getmaxyx(self):
         return self.h-1, self.w-1
 
+    def getyx(self):
+        return self.y, self.x
+
+    def move(self, y, x):
+        self.y, self.x = y, x
+
+    def timeout(self, delay):
+        self.delay = delay
+
+    def chgat(self, y, x, num, attr):
+        pass
+
+    def get_wch(self):
+        """Return the next scripted key; None in the script means no input."""
+        if self.keys:
+            key = self.keys.popleft()
+            if key is not None:
+                return key
+        raise curses.error('no input')
+
 
 class TextBuffer:
     def __init__(self, text=None):
@@ -84,6 +147,49 @@ class TextBuffer:
         self.text = self.text[:-size]
 
 
+class OutputLog:
+    """
+    Bounded record of written text, stored as chunks.
+    The oldest text is dropped beyond max_size characters;
+    the joined text is only built (and cached) when it is read.
+    """
+    def __init__(self, max_size=1000000):
+        self.max_size = max_size
+        self.chunks = deque()
+        self.size = 0
+        self._text = ''
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = ''.join(self.chunks)
+        return self._text
+
+    def __len__(self):
+        return self.size
+
+    def append(self, text):
+        if not text:
+            return
+        self.chunks.append(text)
+        self.size += len(text)
+        while self.size > self.max_size:
+            excess = self.size - self.max_size
+            first = self.chunks[0]
+            if len(first) <= excess:
+                self.chunks.popleft()
+                self.size -= len(first)
+            else:
+                self.chunks[0] = first[excess:]
+                self.size -= excess
+        self._text = None
+
+    def clear(self):
+        self.chunks.clear()
+        self.size = 0
+        self._text = ''
+
+
 class RawLine:
     __slots__ = ('stdscr', 'buffer', 'buffer_pos', 'y', '_minx', '_maxx', '_len')
 
@@ -164,7 +270,12 @@ class RawLine:
     def redraw(self):
         real_buffer_end_pos = min(self.buffer_end_pos, len(self.buffer))
         self.stdscr.addstr(self.y, self.minx, self.buffer[self.buffer_pos: real_buffer_end_pos])
-        self.stdscr.addstr(self.y, self.minx, ' '*(self.buffer_end_pos - real_buffer_end_pos))
+        self.stdscr.addstr(self.y, self.minx + real_buffer_end_pos - self.buffer_pos,
+                           ' '*(self.buffer_end_pos - real_buffer_end_pos))
+
+    def highlight(self, from_x, size, attr):
+        """Change attributes of on-screen text without rewriting it."""
+        self.stdscr.chgat(self.y, from_x, size, attr)
 
 
 class LineController:
@@ -175,6 +286,8 @@ class LineController:
         self.width = self.stdscr.getmaxyx()[1] + 1
         self.buffer = buffer or TextBuffer()
         self.lines = []
+        self.highlights = {}
+        self.dirty_highlights = set()
 
         self.initialize_lines()
 
@@ -183,6 +296,8 @@ class LineController:
         buffer_pos = 0
         y = self.start_y
         self.lines = []
+        self.highlights = {}
+        self.dirty_highlights = set()
         while buffer_pos <= len(self.buffer):
             x = 0 if y != self.start_y else self.start_x
             self.lines.append(
@@ -200,7 +315,17 @@ class LineController:
     def yx_to_pos(self, y, x):
         return (y - self.start_y) * self.width - self.start_x + x
 
+    def _invalidate_highlights(self, from_y):
+        """
+        Mark highlighted lines touched by an edit as dirty:
+        the edit may have reset attributes of only a part of the line,
+        so the next highlight() redraws them in full.
+        """
+        from_index = from_y - self.start_y
+        self.dirty_highlights.update(index for index in self.highlights if index >= from_index)
+
     def insert_yx(self, y, x, text):
+        self._invalidate_highlights(y)
         cur_y = y
         while text:
             cur_x = 0 if cur_y != y else x
@@ -225,6 +350,7 @@ class LineController:
             size -= self.width
 
         size = max(0, min(size, (y-self.start_y)*self.width - self.start_x + x))
+        self._invalidate_highlights(y - 1)  # overflow is pasted to the previous line
         max_y = self.start_y + len(self.lines) - 1
         cur_y = y
         while cur_y <= max_y:
@@ -260,11 +386,155 @@ class LineController:
         for line in self.lines:
             line.redraw()
 
+    def highlight(self, spans, attr=curses.A_REVERSE):
+        """
+        Highlight (start, end) buffer spans, replacing the previous highlighting.
+        Only lines whose highlighted segments changed (or that were edited
+        since) are touched; lines beyond the bottom of the screen are skipped.
+        """
+        max_y = self.stdscr.getmaxyx()[0]
+        highlights = {}
+        for start, end in spans:
+            pos = start
+            while pos < end:
+                y, x = self.pos_to_yx(pos)
+                index = y - self.start_y
+                if y > max_y or index >= len(self.lines):
+                    break
+                size = min(end, self.lines[index].buffer_end_pos) - pos
+                highlights.setdefault(index, []).append((x, size))
+                pos += size
+
+        for index in set(self.highlights) | set(highlights):
+            if index >= len(self.lines):
+                continue
+            segments = highlights.get(index)
+            dirty = index in self.dirty_highlights
+            if not dirty and segments == self.highlights.get(index):
+                continue
+            line = self.lines[index]
+            if dirty or index in self.highlights:
+                line.redraw()  # drop the old attributes
+            for x, size in segments or ():
+                line.highlight(x, size, attr)
+
+        self.highlights = highlights
+        self.dirty_highlights = set()
+
+
+class IncrementalSearch:
+    """
+    Find-as-you-type search over a TextBuffer or an OutputLog.
+    Extending a plain-text query only re-checks the previous matches
+    instead of rescanning the whole text.
+    Regex matches must end within overlap characters after the chunk they start in.
+    """
+    def __init__(self, buffer, chunk_size=65536, overlap=None):
+        self.buffer = buffer
+        self.chunk_size = chunk_size
+        self.overlap = overlap if overlap is not None else chunk_size
+        self.query = ''
+        self.regex = False
+        self.matches = []
+        self.current = None
+        self.error = None
+        self._text = None
+
+    def scan(self, query, regex=False):
+        """
+        Update matches for the query, yielding after every scanned chunk,
+        so that the scan can be run as an idle task.
+        Matches are (start, end) tuples; plain-text matches may overlap.
+        An invalid (e.g. partly typed) regex gives no matches and sets error.
+        """
+        text = self.buffer.text
+        self.error = None
+        if not query:
+            matches = []
+        elif (not regex and not self.regex and text is self._text
+              and self.query and query.startswith(self.query)):
+            size = len(query)
+            matches = [(start, start + size) for start, end in self.matches if text.startswith(query, start)]
+        elif regex:
+            try:
+                pattern = re.compile(query)
+            except re.error as err:
+                self.error = err
+                pattern = None
+            matches = []
+            pos = 0
+            chunk_start = 0
+            while pattern is not None and chunk_start <= len(text):
+                chunk_end = chunk_start + self.chunk_size
+                window_end = min(len(text), chunk_end + self.overlap)
+                pos = max(pos, chunk_start)
+                while pos < chunk_end and pos <= len(text):
+                    match = pattern.search(text, pos, window_end)
+                    if match is not None and match.end() == window_end < len(text):
+                        # may have been cut short by the window: repeat on the full text
+                        match = pattern.search(text, pos)
+                    if match is None or match.start() >= chunk_end:
+                        break
+                    start, end = match.span()
+                    matches.append((start, end))
+                    pos = end if end > start else end + 1
+                chunk_start = chunk_end
+                yield
+        else:
+            size = len(query)
+            matches = []
+            chunk_start = 0
+            while chunk_start < len(text):
+                chunk_end = chunk_start + self.chunk_size + size - 1
+                pos = text.find(query, chunk_start, chunk_end)
+                while pos != -1:
+                    matches.append((pos, pos + size))
+                    pos = text.find(query, pos + 1, chunk_end)
+                chunk_start += self.chunk_size
+                yield
+
+        current_start = self.matches[self.current][0] if self.current is not None else 0
+        self.current = None
+        for ind, (start, end) in enumerate(matches):
+            if start >= current_start:
+                self.current = ind
+                break
+
+        self.query = query
+        self.regex = regex
+        self.matches = matches
+        self._text = text
+
+    def search(self, query, regex=False):
+        for _ in self.scan(query, regex=regex):
+            pass
+        return self.matches
+
+    def current_match(self):
+        return self.matches[self.current] if self.current is not None else None
+
+    def next_match(self):
+        """Jump to the next match, wrapping around."""
+        if not self.matches:
+            return None
+        self.current = 0 if self.current is None else (self.current + 1) % len(self.matches)
+        return self.matches[self.current]
+
+    def previous_match(self):
+        """Jump to the previous match, wrapping around."""
+        if not self.matches:
+            return None
+        self.current = len(self.matches) - 1 if self.current is None else (self.current - 1) % len(self.matches)
+        return self.matches[self.current]
+
 
 class CursedStream:
     def __init__(self, stdscr):
         self.stdscr = stdscr
         self.key_handler_map = ChainMap({})
+        self.idle_tasks = deque()
+        self.frame_hooks = []
+        self.output = None
 
         self.buffer = ''
         self.pos = 0
@@ -298,13 +568,74 @@ class CursedStream:
         finally:
             self.key_handler_map = original_chainmap
 
-    def _readchar_to_buffer(self):
+    def add_idle_task(self, task):
+        """
+        Queue background work to run while waiting for input.
+        task is either a callable (run once) or an iterable/generator,
+        which is advanced one step at a time so that it yields to input.
+        A generator function is called and its generator is queued.
+        """
+        if inspect.isgeneratorfunction(task):
+            task = task()
+        if not callable(task):
+            task = iter(task)
+        self.idle_tasks.append(task)
+
+    def _run_idle_step(self):
+        """Run one step of the next task. A failing task is logged and dropped."""
+        task = self.idle_tasks.popleft()
+        try:
+            if callable(task):
+                task()
+                return
+            next(task)
+        except StopIteration:
+            return
+        except Exception:
+            logger.exception('Idle task %r failed and was dropped', task)
+            return
+        self.idle_tasks.append(task)
+
+    def _wait_for_char(self, deadline=None):
+        """
+        Wait for a key until the deadline, running idle tasks in between.
+        Input is polled before every idle step, so a pending key is never
+        delayed by more than a single step of background work.
+        Frame hooks are called with the stream before every poll.
+        """
+        try:
+            while True:
+                for hook in self.frame_hooks:
+                    hook(self)
+
+                if self.idle_tasks:
+                    delay = 0
+                elif deadline is None:
+                    delay = -1
+                else:
+                    delay = max(0, math.ceil((deadline - time.monotonic()) * 1000))
+                self.stdscr.timeout(delay)
+
+                try:
+                    return self.stdscr.get_wch()
+                except curses.error:
+                    pass
+
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise ReadTimeout
+                if self.idle_tasks:
+                    self._run_idle_step()
+
+        finally:
+            self.stdscr.timeout(-1)
+
+    def _readchar_to_buffer(self, deadline=None):
         """"
         Read a single character from the console.
         If there is a handler for the key, call it.
         If no handler was found and the kay is not a special key, then return it
         """
-        char = self.stdscr.get_wch()
+        char = self._wait_for_char(deadline)
         try:
             self.key_handler_map[char]()
 
@@ -317,17 +648,30 @@ class CursedStream:
         self._clear_buffer()
         return result
 
-    def read(self, length=None):
+    def read(self, length=None, timeout=None, deadline=None):
+        """
+        Read up to length characters (until EOF if length is None).
+        timeout is relative (seconds), deadline is an absolute time.monotonic() value;
+        when either expires, whatever has been read so far is returned.
+        """
+        deadline = make_deadline(timeout, deadline)
         length_before = len(self.buffer)
         while length is None or len(self.buffer) - length_before < length:
             try:
-                self._readchar_to_buffer()
-            except EOFError:
+                self._readchar_to_buffer(deadline)
+            except (EOFError, ReadTimeout):
                 break
 
         return self.flush_buffer()
 
-    def readline(self):
+    def readline(self, timeout=None, deadline=None):
+        """
+        Read a line including the trailing newline.
+        Raise ReadTimeout if the line is not finished in time;
+        the partial line stays in the buffer and the next readline continues it.
+        """
+        deadline = make_deadline(timeout, deadline)
+
         def on_key_enter():
             buffer = self.flush_buffer()
             self.newline()
@@ -336,9 +680,12 @@ class CursedStream:
         with self.key_context():
             self.bind_key('\n', on_key_enter)
             try:
-                return self.read()
+                while True:
+                    self._readchar_to_buffer(deadline)
             except EOLReached as eol:
                 return eol.buffer
+            except EOFError:
+                return self.flush_buffer()
 
     def peekline(self):
         """Return contents of the buffer."""
@@ -418,7 +765,15 @@ class CursedStream:
         self.stdscr.move(new_y, 0)
         self._clear_buffer()
 
+    def record_output(self, max_size=1000000):
+        """Start keeping written text in an OutputLog (e.g. to search it); return the log."""
+        if self.output is None:
+            self.output = OutputLog(max_size)
+        return self.output
+
     def write(self, text):
+        if self.output is not None:
+            self.output.append(text)
         self.move_cursor_to_end()
         while True:
             nl_ind = text.find('\n')
@@ -504,6 +859,141 @@ class EnchantedStream(CursedStream):
         self.addstr(self.get_completion(line, word))
 
 
+class Pane:
+    __slots__ = ('name', 'window', 'stream')
+
+    def __init__(self, name, window, stream):
+        self.name = name
+        self.window = window
+        self.stream = stream
+
+
+class PaneManager:
+    """
+    Several streams sharing one screen, each in its own sub-window.
+    Input is routed to the focused pane. Before every input poll the
+    changed panes are staged with noutrefresh and the screen is updated
+    with a single doupdate per frame. All panes share one idle task queue,
+    which runs whichever pane is being read.
+    """
+    def __init__(self, stdscr):
+        self.stdscr = stdscr
+        self.panes = []
+        self.focused = None
+        self.key_handler_map = {}
+        self.idle_tasks = deque()
+        self._reading = None
+
+    def add_pane(self, name, nlines, ncols, begin_y, begin_x, stream_class=None, **kwargs):
+        """Create a stream in a sub-window of stdscr. The first pane gets focus."""
+        if any(pane.name == name for pane in self.panes):
+            raise ValueError('Pane {0!r} already exists'.format(name))
+
+        window = self.stdscr.derwin(nlines, ncols, begin_y, begin_x)
+        window.keypad(True)
+        stream = (stream_class or EnchantedStream)(window, **kwargs)
+        # keys not bound in the pane's own context fall through to the manager
+        stream.key_handler_map.maps.append(self.key_handler_map)
+        stream.frame_hooks.append(self._on_frame)
+        self.idle_tasks.extend(stream.idle_tasks)
+        stream.idle_tasks = self.idle_tasks
+
+        pane = Pane(name, window, stream)
+        self.panes.append(pane)
+        if self.focused is None:
+            self.focused = pane
+        return stream
+
+    def get_pane(self, name):
+        for pane in self.panes:
+            if pane.name == name:
+                return pane
+        raise KeyError(name)
+
+    def __getitem__(self, name):
+        return self.get_pane(name).stream
+
+    def bind_key(self, key, handler):
+        """Add handler for a key in all panes (pane bindings take precedence)."""
+        if not isinstance(key, (int, str)):
+            raise TypeError('Argument "key" must be an integer or a string')
+
+        self.key_handler_map[key] = handler
+
+    def unbind_key(self, key):
+        del self.key_handler_map[key]
+
+    def focus(self, name):
+        """Focus a pane. A read in progress moves to it on the next frame."""
+        self.focused = self.get_pane(name)
+
+    def focus_next(self, inc=1):
+        ind = self.panes.index(self.focused)
+        self.focused = self.panes[(ind + inc) % len(self.panes)]
+
+    def _on_frame(self, stream):
+        if self._reading is not None and self._reading is not self.focused:
+            raise FocusChanged
+        if self.stage():
+            curses.doupdate()
+
+    def stage(self):
+        """
+        Copy changed panes to the virtual screen without updating it.
+        The focused pane is staged last, so that the cursor ends up in it.
+        Return True if anything was staged.
+        """
+        staged = False
+        for pane in self.panes:
+            if pane is not self.focused and pane.window.is_wintouched():
+                pane.window.noutrefresh()
+                staged = True
+        if self.focused is not None and (staged or self.focused.window.is_wintouched()):
+            self.focused.window.noutrefresh()
+            staged = True
+        return staged
+
+    def refresh(self):
+        """Update the screen with all changed panes at once."""
+        self.stage()
+        curses.doupdate()
+
+    def read(self, length=None, timeout=None, deadline=None):
+        """
+        Read from the focused pane, following focus changes.
+        Input read from a pane that lost focus is carried over into the result
+        and counts towards length.
+        """
+        deadline = make_deadline(timeout, deadline)
+        result = ''
+        while length is None or len(result) < length:
+            pane = self._reading = self.focused
+            try:
+                remaining = None if length is None else length - len(result)
+                return result + pane.stream.read(remaining, deadline=deadline)
+            except FocusChanged:
+                result += pane.stream.flush_buffer()
+            finally:
+                self._reading = None
+
+        return result
+
+    def readline(self, timeout=None, deadline=None):
+        """
+        Read a line from the focused pane, following focus changes.
+        Partial input stays in the buffer of the pane that lost focus.
+        """
+        deadline = make_deadline(timeout, deadline)
+        while True:
+            self._reading = self.focused
+            try:
+                return self.focused.stream.readline(deadline=deadline)
+            except FocusChanged:
+                pass
+            finally:
+                self._reading = None
+
+
 def test_curses(stdscr):
     stream = EnchantedStream(stdscr, completer=lambda line, word: word)
 
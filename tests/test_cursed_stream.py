@@ -0,0 +1,85 @@
+import time
+from unittest import TestCase
+
+from enchantments import MockScr, CursedStream, ReadTimeout
+
+
+class CursedStreamTestCase(TestCase):
+    def make_stream(self, keys):
+        self.stdscr = MockScr(10, 10, keys=keys)
+        return CursedStream(self.stdscr)
+
+    def test_read(self):
+        stream = self.make_stream('abcdef')
+        self.assertEqual('abc', stream.read(3))
+        self.assertEqual(-1, self.stdscr.delay)
+
+    def test_read_deadline(self):
+        stream = self.make_stream(['a', 'b', None, 'c'])
+        self.assertEqual('ab', stream.read(deadline=time.monotonic()))
+        self.assertEqual(-1, self.stdscr.delay)
+
+    def test_readline(self):
+        stream = self.make_stream('ab\ncd\n')
+        self.assertEqual('ab\n', stream.readline())
+        self.assertEqual('cd\n', stream.readline())
+
+    def test_readline_timeout_keeps_partial_line(self):
+        stream = self.make_stream(['a', 'b', None, 'c', '\n'])
+        with self.assertRaises(ReadTimeout):
+            stream.readline(timeout=0)
+        self.assertEqual('ab', stream.peekline())
+        self.assertEqual('abc\n', stream.readline())
+
+    def test_idle_tasks(self):
+        steps = []
+
+        def task():
+            for i in range(3):
+                steps.append(i)
+                yield
+
+        stream = self.make_stream(['a', None, 'b', None, None, None, None, '\n'])
+        stream.add_idle_task(task())
+        stream.add_idle_task(lambda: steps.append('once'))
+        self.assertEqual('ab\n', stream.readline())
+        # one idle step per empty poll, round-robin, never ahead of pending input
+        self.assertEqual([0, 'once', 1, 2], steps)
+        self.assertFalse(stream.idle_tasks)
+
+    def test_idle_task_generator_function(self):
+        steps = []
+
+        def task():
+            steps.append('started')
+            yield
+
+        stream = self.make_stream([None, '\n'])
+        stream.add_idle_task(task)
+        stream.readline()
+        self.assertEqual(['started'], steps)
+
+    def test_failing_idle_task_is_dropped(self):
+        steps = []
+
+        def failing():
+            raise RuntimeError('boom')
+
+        stream = self.make_stream(['a', None, None, 'b', '\n'])
+        stream.add_idle_task(failing)
+        stream.add_idle_task(lambda: steps.append('next'))
+        with self.assertLogs('enchantments', level='ERROR'):
+            self.assertEqual('ab\n', stream.readline())
+        self.assertEqual(['next'], steps)
+        self.assertFalse(stream.idle_tasks)
+
+    def test_record_output(self):
+        stream = self.make_stream('')
+        stream.write('not recorded\n')
+        self.assertIsNone(stream.output)
+
+        output = stream.record_output(max_size=8)
+        stream.write('abc\n')
+        stream.write('defgh')
+        self.assertIs(output, stream.output)
+        self.assertEqual('bc\ndefgh', output.text)
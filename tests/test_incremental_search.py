@@ -0,0 +1,64 @@
+from unittest import TestCase
+
+from enchantments import TextBuffer, IncrementalSearch
+
+
+class IncrementalSearchTestCase(TestCase):
+    def setUp(self):
+        self.buffer = TextBuffer('abcab aab abcabc')
+        self.search = IncrementalSearch(self.buffer, chunk_size=4)
+
+    def test_search(self):
+        self.assertEqual([(0, 2), (3, 5), (7, 9), (10, 12), (13, 15)], self.search.search('ab'))
+        self.assertEqual([(0, 3), (10, 13), (13, 16)], self.search.search('abc'))
+
+    def test_search_overlapping(self):
+        self.buffer.text = 'aaaab'
+        self.assertEqual([(0, 2), (1, 3), (2, 4)], self.search.search('aa'))
+        self.assertEqual([(2, 5)], self.search.search('aab'))
+
+    def test_extended_query_reuses_matches(self):
+        self.search.search('ab')
+        scan = self.search.scan('abc')
+        self.assertEqual([], list(scan))  # no chunks rescanned
+        self.assertEqual([(0, 3), (10, 13), (13, 16)], self.search.matches)
+
+    def test_changed_text_rescans(self):
+        self.search.search('ab')
+        self.buffer.append('ab')
+        self.assertEqual((16, 18), self.search.search('ab')[-1])
+
+    def test_regex(self):
+        self.assertEqual([(0, 3), (10, 16)], self.search.search('(abc)+', regex=True))
+        self.assertEqual([(3, 4), (6, 8)], self.search.search('a+(?=b )', regex=True))
+
+    def test_regex_scanned_in_chunks(self):
+        self.buffer.text = 'x' * 1000 + 'abcabc'
+        self.search.chunk_size = 100
+        self.assertEqual(11, len(list(self.search.scan('(abc)+', regex=True))))
+        self.assertEqual([(1000, 1006)], self.search.matches)
+
+    def test_regex_match_across_window(self):
+        self.buffer.text = 'xxx' + 'a' * 20
+        self.assertEqual([(3, 23)], self.search.search('a+', regex=True))
+
+    def test_invalid_regex(self):
+        self.search.search('ab')
+        self.assertEqual([], self.search.search('(ab', regex=True))
+        self.assertIsNotNone(self.search.error)
+        self.assertEqual(3, len(self.search.search('(ab)c', regex=True)))
+        self.assertIsNone(self.search.error)
+
+    def test_next_previous_match(self):
+        self.search.search('abc')
+        self.assertEqual((0, 3), self.search.current_match())
+        self.assertEqual((10, 13), self.search.next_match())
+        self.assertEqual((13, 16), self.search.next_match())
+        self.assertEqual((0, 3), self.search.next_match())
+        self.assertEqual((13, 16), self.search.previous_match())
+
+    def test_current_match_kept_while_typing(self):
+        self.search.search('a')
+        while self.search.current_match() != (6, 7):
+            self.search.next_match()
+        self.assertEqual((7, 9), self.search.search('ab')[self.search.current])
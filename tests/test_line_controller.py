@@ -3,6 +3,25 @@ from unittest import TestCase
 from enchantments import MockScr, TextBuffer, LineController
 
 
+class RecordingScr(MockScr):
+    """Records drawing calls and tracks which cells carry attributes."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+        self.attrs = {}
+
+    def addstr(self, y, x, s):
+        super().addstr(y, x, s)
+        self.calls.append(('addstr', y, x, s))
+        for cur_x in range(x, x + len(s)):
+            self.attrs.pop((y, cur_x), None)
+
+    def chgat(self, y, x, num, attr):
+        self.calls.append(('chgat', y, x, num))
+        for cur_x in range(x, x + num):
+            self.attrs[(y, cur_x)] = attr
+
+
 class LineControllerTestCase(TestCase):
     def setUp(self):
         self.text = 'abcdefghij' \
@@ -62,3 +81,59 @@ class LineControllerTestCase(TestCase):
             'IJ0123789',
             self.buffer.text)
         self.assertEqual(2, len(self.controller.lines))
+
+    def test_highlight(self):
+        stdscr = RecordingScr(10, 10)
+        controller = LineController(stdscr, 0, 0, buffer=self.buffer)
+
+        controller.highlight([(8, 12), (25, 27)])
+        self.assertEqual(
+            [('chgat', 0, 8, 2), ('chgat', 1, 0, 2), ('chgat', 2, 5, 2)],
+            sorted(stdscr.calls))
+
+        # only the lines that lost highlighting are redrawn
+        stdscr.calls = []
+        controller.highlight([(25, 27)])
+        self.assertEqual(
+            [('addstr', 0, 0, 'abcdefghij'), ('addstr', 0, 10, ''),
+             ('addstr', 1, 0, 'ABCDEFGHIJ'), ('addstr', 1, 10, '')],
+            sorted(stdscr.calls))
+
+        stdscr.calls = []
+        controller.highlight([(25, 27)])
+        self.assertEqual([], stdscr.calls)
+
+    def test_highlight_after_delete(self):
+        self.controller.highlight([(25, 27)])
+        self.controller.delete_backward_yx(y=2, x=10, size=27)
+        self.assertEqual(2, len(self.controller.lines))
+        self.controller.highlight([])
+        self.assertEqual({}, self.controller.highlights)
+
+    def test_highlight_cleared_after_insert(self):
+        stdscr = RecordingScr(10, 10)
+        controller = LineController(stdscr, 0, 0, buffer=self.buffer)
+        controller.highlight([(0, 2)])
+        controller.insert_yx(y=0, x=5, text='q')
+        controller.highlight([])
+        self.assertEqual({}, stdscr.attrs)
+
+    def test_highlight_cleared_after_delete(self):
+        stdscr = RecordingScr(10, 10)
+        controller = LineController(stdscr, 0, 0, buffer=self.buffer)
+        controller.highlight([(12, 14)])
+        controller.delete_backward_yx(y=2, x=5, size=1)
+        controller.highlight([])
+        self.assertEqual({}, stdscr.attrs)
+
+    def test_highlight_repainted_after_edit(self):
+        stdscr = RecordingScr(10, 10)
+        controller = LineController(stdscr, 0, 0, buffer=self.buffer)
+        controller.highlight([(2, 4), (25, 27)])
+        controller.insert_yx(y=1, x=2, text='q')
+
+        # the same spans again: edited lines are redrawn and painted in full
+        controller.highlight([(2, 4), (25, 27)])
+        self.assertEqual(
+            {(0, 2), (0, 3), (2, 5), (2, 6)},
+            {cell for cell, attr in stdscr.attrs.items() if attr})
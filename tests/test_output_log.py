@@ -0,0 +1,35 @@
+from unittest import TestCase
+
+from enchantments import OutputLog
+
+
+class OutputLogTestCase(TestCase):
+    def setUp(self):
+        self.log = OutputLog(max_size=10)
+
+    def test_append(self):
+        self.log.append('abc')
+        self.log.append('def\n')
+        self.assertEqual('abcdef\n', self.log.text)
+        self.assertEqual(7, len(self.log))
+
+    def test_text_cached_until_append(self):
+        self.log.append('abc')
+        text = self.log.text
+        self.assertIs(text, self.log.text)
+        self.log.append('d')
+        self.assertIsNot(text, self.log.text)
+
+    def test_max_size(self):
+        self.log.append('abcdef')
+        self.log.append('ghijkl')
+        self.assertEqual('cdefghijkl', self.log.text)
+        self.log.append('0123456789ABC')
+        self.assertEqual('3456789ABC', self.log.text)
+        self.assertEqual(10, len(self.log))
+
+    def test_clear(self):
+        self.log.append('abc')
+        self.log.clear()
+        self.assertEqual('', self.log.text)
+        self.assertEqual(0, len(self.log))
@@ -0,0 +1,106 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from enchantments import MockScr, CursedStream, PaneManager, ReadTimeout
+
+
+class PaneManagerTestCase(TestCase):
+    def setUp(self):
+        self.stdscr = MockScr(20, 40)
+        self.manager = PaneManager(self.stdscr)
+        self.log = self.manager.add_pane('log', 15, 40, 0, 0, stream_class=CursedStream)
+        self.input = self.manager.add_pane('input', 5, 40, 15, 0, stream_class=CursedStream)
+
+        patcher = patch('enchantments.curses.doupdate')
+        self.doupdate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_add_pane(self):
+        self.assertIs(self.log, self.manager['log'])
+        self.assertEqual((14, 39), self.log.stdscr.getmaxyx())
+        self.assertEqual('log', self.manager.focused.name)
+        with self.assertRaises(ValueError):
+            self.manager.add_pane('log', 1, 1, 0, 0)
+
+    def test_readline_routes_to_focused_pane(self):
+        self.manager.focus('input')
+        self.stdscr.keys.extend('ab\n')
+        self.assertEqual('ab\n', self.manager.readline())
+        self.assertEqual('', self.log.peekline())
+
+    def test_focus_change_during_readline(self):
+        self.manager.bind_key('\t', self.manager.focus_next)
+        self.stdscr.keys.extend('ab\tcd\n')
+        self.assertEqual('cd\n', self.manager.readline())
+        self.assertEqual('input', self.manager.focused.name)
+        self.assertEqual('ab', self.log.peekline())
+
+    def test_read_carries_over_on_focus_change(self):
+        self.manager.bind_key('\t', self.manager.focus_next)
+        self.stdscr.keys.extend('ab\tcdef')
+        self.assertEqual('abcd', self.manager.read(4))
+        self.assertEqual('input', self.manager.focused.name)
+        self.assertEqual('', self.log.peekline())
+        self.assertEqual('ef', self.manager.read(2))
+
+    def test_pane_bindings_take_precedence(self):
+        calls = []
+        self.manager.bind_key('x', lambda: calls.append('manager'))
+        self.log.bind_key('x', lambda: calls.append('log'))
+        self.stdscr.keys.extend('x\n')
+        self.manager.readline()
+        self.assertEqual(['log'], calls)
+
+    def test_unfocused_pane_output_reaches_screen(self):
+        self.manager.focus('input')
+        self.input.add_idle_task(lambda: self.log.write('message'))
+        self.stdscr.keys.extend([None, None, None])
+        with self.assertRaises(ReadTimeout):
+            self.manager.readline(timeout=0.05)
+        # one screen update for the frame after the write, none for idle frames
+        self.doupdate.assert_called_once_with()
+        self.assertFalse(self.log.stdscr.is_wintouched())
+
+    def test_one_update_per_frame(self):
+        self.manager.focus('input')
+
+        def write_both():
+            self.log.write('message')
+            self.input.write('>>> ')
+
+        self.input.add_idle_task(write_both)
+        self.stdscr.keys.extend([None, '\n'])
+        self.manager.readline()
+        self.assertEqual(1, self.doupdate.call_count)
+
+    def test_idle_tasks_shared_between_panes(self):
+        steps = []
+        self.log.add_idle_task(lambda: steps.append('log'))
+        self.manager.focus('input')
+        self.stdscr.keys.extend([None, '\n'])
+        self.manager.readline()
+        self.assertEqual(['log'], steps)
+        self.assertIs(self.manager.idle_tasks, self.input.idle_tasks)
+
+    def test_stream_idle_tasks_kept_on_add_pane(self):
+        steps = []
+
+        class BusyStream(CursedStream):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.add_idle_task(lambda: steps.append('busy'))
+
+        busy = self.manager.add_pane('busy', 1, 40, 19, 0, stream_class=BusyStream)
+        self.assertIs(self.manager.idle_tasks, busy.idle_tasks)
+        self.assertEqual(1, len(self.manager.idle_tasks))
+        self.stdscr.keys.extend([None, '\n'])
+        self.manager.readline()
+        self.assertEqual(['busy'], steps)
+
+    def test_refresh(self):
+        self.log.write('message')
+        self.input.write('>>> ')
+        self.manager.refresh()
+        self.doupdate.assert_called_once_with()
+        self.assertFalse(self.log.stdscr.is_wintouched())
+        self.assertFalse(self.input.stdscr.is_wintouched())